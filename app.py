@@ -1,13 +1,34 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory
+import eventlet
+import eventlet.tpool
+# patch sockets/threads before anything else imports them
+eventlet.monkey_patch()
+# psycopg2 is a C driver that monkey_patch can't reach; make its waits yield to the hub
+from psycogreen.eventlet import patch_psycopg
+patch_psycopg()
+
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify, send_from_directory
 from flask_sqlalchemy import SQLAlchemy
+from flask_session import Session
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user, UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from werkzeug.security import check_password_hash, safe_join
 from werkzeug.utils import secure_filename
-from datetime import datetime
 from config import Config
-from flask_socketio import SocketIO, join_room, leave_room, emit
+from flask_socketio import SocketIO, join_room, leave_room, emit, rooms
+from jinja2 import FileSystemBytecodeCache
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, make_transient_to_detached, selectinload
+import hashlib
+import itertools
+import mimetypes
+import msgpack
 import os
-import random
+import redis
+import tempfile
+from urllib.parse import unquote
 
 # ------------------ APP & DB SETUP ------------------
 app = Flask(__name__)
@@ -18,10 +39,22 @@ app.config['UPLOAD_FOLDER'] = app.config.get('UPLOAD_FOLDER', 'uploads')
 if not os.path.exists(app.config['UPLOAD_FOLDER']):
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# compiled templates are cached on disk across workers and restarts; the default
+# directory is a private (0700, owner-checked) per-user dir under the temp dir
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+
+redis_client = redis.Redis.from_url(app.config['REDIS_URL'])
+app.config['SESSION_REDIS'] = redis_client
+Session(app)
+
 db = SQLAlchemy(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# redis pub/sub fans emits out across every worker process
+socketio = SocketIO(app, async_mode='eventlet', message_queue=app.config['REDIS_URL'],
+                    cors_allowed_origins="*")
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
+# signs the short-lived token a page hands to its socket.io connection
+socket_token_serializer = URLSafeTimedSerializer(app.config['SECRET_KEY'], salt='socket-auth')
 
 # ------------------ MANY-TO-MANY TABLE ------------------
 board_collaborators = db.Table(
@@ -31,27 +64,38 @@ board_collaborators = db.Table(
 )
 
 # ------------------ MODELS ------------------
+def utc_now():
+    # timestamp filled in by Postgres on INSERT (naive UTC, as datetime.utcnow was)
+    return db.func.timezone('utc', db.func.now())
+
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
-    date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    date_created = db.Column(db.DateTime, server_default=utc_now(), nullable=False)
     boards = db.relationship('Board', backref='owner', lazy=True, cascade="all, delete")
+    # usernames are unique regardless of case
+    __table_args__ = (db.Index('ix_users_username_lower', db.func.lower(username), unique=True),)
 
 
 class Board(db.Model):
     __tablename__ = 'board'
+    __table_args__ = (db.Index('ix_board_user_id', 'user_id'),)
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    date_created = db.Column(db.DateTime, server_default=utc_now(), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
     lists = db.relationship('List', backref='board', cascade="all, delete", lazy=True)
-    collaborators = db.relationship('User', secondary=board_collaborators, backref='shared_boards', lazy='subquery')
+    # selectin: one IN (...) query per batch of boards; shared_boards is queried explicitly in get_user_boards
+    collaborators = db.relationship('User', secondary=board_collaborators,
+                                    backref=db.backref('shared_boards', lazy='select'), lazy='selectin')
 
 
 class List(db.Model):
     __tablename__ = 'list'
+    __table_args__ = (db.Index('ix_list_board_id', 'board_id'),)
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     board_id = db.Column(db.Integer, db.ForeignKey('board.id', ondelete="CASCADE"), nullable=False)
@@ -60,31 +104,88 @@ class List(db.Model):
 
 class Card(db.Model):
     __tablename__ = 'card'
+    # covers the ordered per-list fetch behind List.cards (order_by position)
+    __table_args__ = (db.Index('ix_card_list_position', 'list_id', 'position'),)
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
     position = db.Column(db.Integer, default=0)
-    date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    date_created = db.Column(db.DateTime, server_default=utc_now(), nullable=False)
     list_id = db.Column(db.Integer, db.ForeignKey('list.id', ondelete="CASCADE"), nullable=False)
 
 # ------------------ MOTIVATIONAL LINES ------------------
-motivations = [
+motivations = (
     "Push yourself — no one else will do it for you!",
     "Success is built one small step at a time.",
     "Dream big. Start small. Act now.",
     "Every day is progress — keep going!",
     "Your only limit is your effort today."
-]
+)
+# next() on a cycle is a single C call, no shared PRNG state per render
+_motivation_iter = itertools.cycle(motivations)
 
 @app.context_processor
 def inject_motivation():
-    # A random motivational line injected into all templates as `motivation`
-    return {'motivation': random.choice(motivations)}
+    # A rotating motivational line injected into all templates as `motivation`
+    return {'motivation': next(_motivation_iter)}
+
+def make_socket_token():
+    return socket_token_serializer.dumps({'uid': current_user.id, 'username': current_user.username})
+
+@app.context_processor
+def inject_socket_token():
+    # pages pass this as io({auth: {token}}) so sockets authenticate once at connect
+    if current_user.is_authenticated:
+        return {'socket_token': make_socket_token()}
+    return {}
+
+# ------------------ PASSWORD HASHING ------------------
+# argon2id, tuned to ~50 ms per hash; legacy werkzeug (pbkdf2/scrypt) hashes still verify
+password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+def hash_password(pwd):
+    # run in a native thread so the eventlet hub keeps serving sockets meanwhile
+    return eventlet.tpool.execute(password_hasher.hash, pwd)
+
+def verify_password(stored, pwd):
+    if not stored.startswith('$argon2'):
+        return eventlet.tpool.execute(check_password_hash, stored, pwd)
+    try:
+        return eventlet.tpool.execute(password_hasher.verify, stored, pwd)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def needs_rehash(stored):
+    return not stored.startswith('$argon2') or password_hasher.check_needs_rehash(stored)
 
 # ------------------ LOGIN MANAGEMENT ------------------
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # cache only id/username in redis so authenticated requests skip a SELECT
+    key = f'user:{user_id}'
+    cached = redis_client.get(key)
+    if cached is not None:
+        user = User(**msgpack.unpackb(cached))
+        # give it an identity (other columns expire) and attach without hitting the DB,
+        # so identity checks against loaded relationships still work
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+    user = User.query.get(int(user_id))
+    if user:
+        row = {'id': user.id, 'username': user.username}
+        redis_client.setex(key, app.config['USER_CACHE_TTL'], msgpack.packb(row))
+    return user
+
+# ------------------ ACCESS CHECKS ------------------
+def is_collaborator(board_id, user_id):
+    # single primary-key lookup on board_collaborators instead of loading the collection
+    return db.session.query(db.exists().where(
+        board_collaborators.c.board_id == board_id,
+        board_collaborators.c.user_id == user_id
+    )).scalar()
+
+def can_access_board(board):
+    return board.user_id == current_user.id or is_collaborator(board.id, current_user.id)
 
 # ------------------ ROUTES ------------------
 @app.route('/')
@@ -98,14 +199,16 @@ def register():
         uname = request.form['username']
         pwd = request.form['password']
 
-        if User.query.filter_by(username=uname).first():
-            flash('Username already exists!')
-            return redirect(url_for('register'))
-
-        hashed_pwd = generate_password_hash(pwd)
+        hashed_pwd = hash_password(pwd)
         new_user = User(username=uname, password=hashed_pwd)
         db.session.add(new_user)
-        db.session.commit()
+        # the unique index decides; no SELECT beforehand (and no race window)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            flash('Username already exists!')
+            return redirect(url_for('register'))
         flash('Registration successful! Please login.')
         return redirect(url_for('login'))
 
@@ -119,7 +222,12 @@ def login():
         pwd = request.form['password']
         user = User.query.filter_by(username=uname).first()
 
-        if user and check_password_hash(user.password, pwd):
+        if user and verify_password(user.password, pwd):
+            if needs_rehash(user.password):
+                # upgrade legacy hashes transparently on successful login
+                user.password = hash_password(pwd)
+                db.session.commit()
+                redis_client.delete(f'user:{user.id}')
             login_user(user)
             return redirect(url_for('dashboard'))
         else:
@@ -134,15 +242,83 @@ def logout():
     flash('You have been logged out.')
     return redirect(url_for('login'))
 
+@app.route('/socket_token')
+@login_required
+def socket_token():
+    # long-lived pages fetch a fresh token when the server rejects an expired one
+    return jsonify({'token': make_socket_token()})
+
 # ------------------ DASHBOARD ------------------
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    owned = Board.query.filter_by(user_id=current_user.id).all()
-    shared = current_user.shared_boards
-    boards = owned + shared
+    boards = get_user_boards(current_user.id)
     return render_template('dashboard.html', boards=boards)
 
+
+def get_user_boards(user_id):
+    """
+    Returns the owned + shared boards of a user as plain dicts (the shape the
+    dashboard template reads), cached in redis for DASHBOARD_CACHE_TTL seconds.
+    """
+    key = f'boards:{user_id}'
+    cached = redis_client.get(key)
+    if cached is not None:
+        return msgpack.unpackb(cached)
+
+    # eager-load owner + collaborators so building the dicts doesn't lazy-load per board
+    owned = Board.query.options(
+        joinedload(Board.owner),
+        selectinload(Board.collaborators)
+    ).filter_by(user_id=user_id).all()
+    shared = Board.query.join(board_collaborators).options(
+        joinedload(Board.owner),
+        selectinload(Board.collaborators)
+    ).filter(board_collaborators.c.user_id == user_id).all()
+
+    boards = [{
+        'id': board.id,
+        'name': board.name,
+        'owner': {'id': board.owner.id, 'username': board.owner.username},
+        'collaborators': [{'id': u.id, 'username': u.username} for u in board.collaborators]
+    } for board in owned + shared]
+    redis_client.setex(key, app.config['DASHBOARD_CACHE_TTL'], msgpack.packb(boards))
+    return boards
+
+
+def invalidate_board_cache(*user_ids):
+    # drop the cached dashboard of every user who can see a changed board
+    if user_ids:
+        redis_client.delete(*(f'boards:{uid}' for uid in user_ids))
+
+
+def board_member_ids(board):
+    return [board.user_id] + [u.id for u in board.collaborators]
+
+
+def notify_dashboards(*user_ids):
+    # only the users who can see the board get a refresh, not every client
+    for uid in user_ids:
+        socketio.emit('refresh_dashboard', room=f'user_{uid}')
+
+
+# board_id -> greenthread that will emit the coalesced refresh_board
+_pending_board_refreshes = {}
+
+def schedule_board_refresh(board_id):
+    """
+    Coalesces refresh_board events: a CRUD burst on one board produces a
+    single emit BOARD_REFRESH_DELAY seconds after the first change.
+    """
+    if board_id in _pending_board_refreshes:
+        return
+    _pending_board_refreshes[board_id] = eventlet.spawn_after(
+        app.config['BOARD_REFRESH_DELAY'], _flush_board_refresh, board_id)
+
+def _flush_board_refresh(board_id):
+    _pending_board_refreshes.pop(board_id, None)
+    socketio.emit('refresh_board', {'board_id': board_id}, room=f'board_{board_id}')
+
 # ------------------ BOARD CRUD ------------------
 @app.route('/create_board', methods=['POST'])
 @login_required
@@ -151,9 +327,9 @@ def create_board():
     new_board = Board(name=name, user_id=current_user.id)
     db.session.add(new_board)
     db.session.commit()
+    invalidate_board_cache(current_user.id)
     flash("✅ Board created successfully!")
-    # emit to all connected clients (dashboard refresh)
-    socketio.emit('refresh_dashboard')
+    notify_dashboards(current_user.id)
     return redirect(url_for('dashboard'))
 
 
@@ -166,8 +342,10 @@ def update_board(board_id):
         return redirect(url_for('dashboard'))
     board.name = request.form['board_name']
     db.session.commit()
+    member_ids = board_member_ids(board)
+    invalidate_board_cache(*member_ids)
     flash("✅ Board renamed successfully!")
-    socketio.emit('refresh_dashboard')
+    notify_dashboards(*member_ids)
     return redirect(url_for('dashboard'))
 
 
@@ -178,22 +356,28 @@ def delete_board(board_id):
     if board.owner.id != current_user.id:
         flash("⚠️ Unauthorized action.")
         return redirect(url_for('dashboard'))
+    member_ids = board_member_ids(board)
     db.session.delete(board)
     db.session.commit()
+    invalidate_board_cache(*member_ids)
     flash("🗑️ Board deleted successfully!")
-    socketio.emit('refresh_dashboard')
+    notify_dashboards(*member_ids)
     return redirect(url_for('dashboard'))
 
 # ------------------ VIEW BOARD ------------------
 @app.route('/board/<int:board_id>')
 @login_required
 def view_board(board_id):
-    board = Board.query.get_or_404(board_id)
-    if board.owner.id != current_user.id and current_user not in board.collaborators:
+    # one round trip per relationship instead of one per list for its cards
+    board = Board.query.options(
+        selectinload(Board.lists).selectinload(List.cards),
+        selectinload(Board.collaborators)
+    ).get_or_404(board_id)
+    # collaborators are loaded anyway for the template, so check them in memory
+    if board.user_id != current_user.id and not any(u.id == current_user.id for u in board.collaborators):
         flash("Access denied.")
         return redirect(url_for('dashboard'))
-    lists = List.query.filter_by(board_id=board.id).all()
-    return render_template('board.html', board=board, lists=lists)
+    return render_template('board.html', board=board, lists=board.lists)
 
 # ------------------ COLLABORATORS ------------------
 @app.route('/add_collaborator/<int:board_id>', methods=['POST'])
@@ -214,8 +398,11 @@ def add_collaborator(board_id):
     else:
         board.collaborators.append(user)
         db.session.commit()
+        member_ids = board_member_ids(board)
+        invalidate_board_cache(*member_ids)
         flash(f"✅ {username} added as collaborator!")
-        socketio.emit('refresh_board', {'board_id': board_id}, room=f'board_{board_id}')
+        notify_dashboards(*member_ids)
+        schedule_board_refresh(board_id)
 
     return redirect(url_for('view_board', board_id=board_id))
 
@@ -228,7 +415,7 @@ def add_list(board_id):
     db.session.add(new_list)
     db.session.commit()
     flash("✅ List added successfully!")
-    socketio.emit('refresh_board', {'board_id': board_id}, room=f'board_{board_id}')
+    schedule_board_refresh(board_id)
     return redirect(url_for('view_board', board_id=board_id))
 
 
@@ -239,7 +426,7 @@ def update_list(list_id):
     list_item.name = request.form['list_name']
     db.session.commit()
     flash("✅ List updated successfully!")
-    socketio.emit('refresh_board', {'board_id': list_item.board_id}, room=f'board_{list_item.board_id}')
+    schedule_board_refresh(list_item.board_id)
     return redirect(url_for('view_board', board_id=list_item.board_id))
 
 
@@ -251,10 +438,18 @@ def delete_list(list_id):
     db.session.delete(list_item)
     db.session.commit()
     flash("🗑️ List deleted successfully!")
-    socketio.emit('refresh_board', {'board_id': board_id}, room=f'board_{board_id}')
+    schedule_board_refresh(board_id)
     return redirect(url_for('view_board', board_id=board_id))
 
 # ------------------ CARD CRUD ------------------
+def card_response(board_id, message, **payload):
+    # JSON clients patch their UI themselves; browsers go back to a fixed board URL
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'message': message, 'board_id': board_id, **payload}), 200
+    flash(message)
+    return redirect(url_for('view_board', board_id=board_id))
+
+
 @app.route('/add_card/<int:list_id>', methods=['POST'])
 @login_required
 def add_card(list_id):
@@ -263,13 +458,12 @@ def add_card(list_id):
     new_card = Card(title=title, description=description, list_id=list_id)
     db.session.add(new_card)
     db.session.commit()
-    flash("✅ Card added successfully!")
     try:
         board_id = new_card.list.board_id
     except Exception:
         board_id = list_id
-    socketio.emit('refresh_board', {'board_id': board_id}, room=f'board_{board_id}')
-    return redirect(request.referrer)
+    schedule_board_refresh(board_id)
+    return card_response(board_id, "✅ Card added successfully!", card_id=new_card.id)
 
 
 @app.route('/update_card/<int:card_id>', methods=['POST'])
@@ -279,9 +473,9 @@ def update_card(card_id):
     card.title = request.form['card_title']
     card.description = request.form.get('card_description', '')
     db.session.commit()
-    flash("✅ Card updated successfully!")
-    socketio.emit('refresh_board', {'board_id': card.list.board_id}, room=f'board_{card.list.board_id}')
-    return redirect(request.referrer)
+    board_id = card.list.board_id
+    schedule_board_refresh(board_id)
+    return card_response(board_id, "✅ Card updated successfully!", card_id=card.id)
 
 
 @app.route('/delete_card/<int:card_id>', methods=['POST'])
@@ -291,9 +485,8 @@ def delete_card(card_id):
     board_id = card.list.board_id
     db.session.delete(card)
     db.session.commit()
-    flash("🗑️ Card deleted successfully!")
-    socketio.emit('refresh_board', {'board_id': board_id}, room=f'board_{board_id}')
-    return redirect(request.referrer)
+    schedule_board_refresh(board_id)
+    return card_response(board_id, "🗑️ Card deleted successfully!", card_id=card_id)
 
 # ------------------ CARD MOVE ------------------
 @app.route('/move_card/<int:card_id>/<int:new_list_id>', methods=['POST'])
@@ -301,10 +494,15 @@ def delete_card(card_id):
 def move_card(card_id, new_list_id):
     data = request.get_json()
     new_position = data.get('new_position', 0)
+    # socket id of the initiating tab: it already moved the card locally
+    sender_sid = data.get('sid')
     card = Card.query.get_or_404(card_id)
-    new_list = List.query.get_or_404(new_list_id)
+    # the access check is an EXISTS, so skip the default selectin of collaborators
+    new_list = List.query.options(
+        joinedload(List.board).lazyload(Board.collaborators)
+    ).get_or_404(new_list_id)
 
-    if new_list.board.owner.id != current_user.id and current_user not in new_list.board.collaborators:
+    if not can_access_board(new_list.board):
         return jsonify({"error": "Unauthorized"}), 403
 
     card.list_id = new_list_id
@@ -315,10 +513,51 @@ def move_card(card_id, new_list_id):
         'card_id': card.id,
         'new_list_id': new_list_id,
         'board_id': new_list.board_id
-    }, room=f'board_{new_list.board_id}')
+    }, room=f'board_{new_list.board_id}', skip_sid=sender_sid)
 
     return jsonify({"message": "Card moved successfully"}), 200
 
+
+@app.route('/reorder_list/<int:list_id>', methods=['POST'])
+@login_required
+def reorder_list(list_id):
+    """
+    Accepts { card_ids: [...], sid? } with the full card order of a list and
+    writes every position (and list_id, for cards dropped in from another
+    list) in a single executemany UPDATE + one commit + one emit.
+    """
+    data = request.get_json(silent=True)
+    card_ids = data.get('card_ids') if isinstance(data, dict) else None
+    if not isinstance(card_ids, list) or not all(
+            isinstance(cid, int) and not isinstance(cid, bool) for cid in card_ids):
+        return jsonify({"error": "card_ids must be a list of integers"}), 400
+    # a duplicate id would get two conflicting positions in the executemany
+    if len(card_ids) != len(set(card_ids)):
+        return jsonify({"error": "Duplicate card id"}), 400
+    sender_sid = data.get('sid')
+    target_list = List.query.options(
+        joinedload(List.board).lazyload(Board.collaborators)
+    ).get_or_404(list_id)
+    board = target_list.board
+
+    if not can_access_board(board):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    # every card must already belong to a list on this board
+    known = Card.query.join(List).filter(Card.id.in_(card_ids), List.board_id == board.id).count()
+    if known != len(card_ids):
+        return jsonify({"error": "Unknown card"}), 400
+
+    if card_ids:
+        db.session.execute(update(Card), [
+            {'id': cid, 'position': pos, 'list_id': list_id}
+            for pos, cid in enumerate(card_ids)
+        ])
+    db.session.commit()
+
+    socketio.emit('refresh_board', {'board_id': board.id}, room=f'board_{board.id}', skip_sid=sender_sid)
+    return jsonify({"message": "List reordered successfully"}), 200
+
 # ------------------ FILE UPLOAD ------------------
 @app.route('/upload', methods=['POST'])
 @login_required
@@ -326,36 +565,116 @@ def upload_file():
     """
     Saves the uploaded file into app.config['UPLOAD_FOLDER'] and returns a JSON:
     { "file_url": "<absolute url to /uploads/<filename>>" }
+
+    The file is sent as the raw request body with its name in the X-Filename
+    header, so it is streamed straight to disk without a temporary spool.
+    A multipart 'file' field is still accepted for older clients.
     """
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file part'}), 400
+    if request.mimetype == 'multipart/form-data':
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file part'}), 400
+        file = request.files['file']
+        original_name, source = file.filename, file.stream
+    else:
+        original_name, source = unquote(request.headers.get('X-Filename', '')), request.stream
 
-    file = request.files['file']
-    if file.filename == '':
+    if not original_name:
         return jsonify({'error': 'No selected file'}), 400
 
-    # secure and prefix filename to avoid collisions
-    filename = secure_filename(file.filename)
-    timestamp = int(datetime.utcnow().timestamp())
-    final_name = f"{timestamp}_{filename}"
-    save_path = os.path.join(app.config['UPLOAD_FOLDER'], final_name)
-    # ensure directory exists
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    file.save(save_path)
+    # stream to a temp file while hashing, then name it after the content hash
+    upload_dir = app.config['UPLOAD_FOLDER']
+    os.makedirs(upload_dir, exist_ok=True)
+    tmp_path, digest = write_stream(source, upload_dir)
+    final_name = f"{digest}_{secure_filename(original_name)}"
+    save_path = os.path.join(upload_dir, final_name)
+    if os.path.exists(save_path):
+        # same bytes already stored under this name: keep the existing copy
+        os.unlink(tmp_path)
+    else:
+        os.replace(tmp_path, save_path)
 
     # return absolute URL to the uploaded file (served by /uploads/<filename>)
     file_url = url_for('uploaded_file', filename=final_name, _external=True)
     return jsonify({'file_url': file_url}), 200
 
+
+def write_stream(source, directory):
+    """
+    Copies `source` in fixed-size chunks straight to a temp file in `directory`,
+    hashing as it goes. Returns (temp_path, blake2b hex digest).
+    """
+    chunk_size = app.config['UPLOAD_CHUNK_SIZE']
+    digest = hashlib.blake2b(digest_size=16)
+    fd, tmp_path = tempfile.mkstemp(prefix='.upload-', dir=directory)
+    try:
+        os.fchmod(fd, 0o644)
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            # os.write may write less than asked; loop so the file matches the digest
+            view = memoryview(chunk)
+            while view:
+                view = view[os.write(fd, view):]
+    except Exception:
+        os.close(fd)
+        os.unlink(tmp_path)
+        raise
+    os.close(fd)
+    return tmp_path, digest.hexdigest()
+
+
 @app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
-    # serve uploaded files
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    # names are content-hashed, so a given URL never changes and can be cached forever
+    max_age = app.config['UPLOAD_CACHE_MAX_AGE']
+    # behind nginx, hand the file to the web server (sendfile) via X-Accel-Redirect
+    accel_prefix = app.config.get('UPLOADS_ACCEL_REDIRECT')
+    if accel_prefix:
+        internal_path = safe_join(accel_prefix, filename)
+        if internal_path is None:
+            return jsonify({'error': 'Not found'}), 404
+        # nginx keeps the upstream Content-Type, so it must match the file, not text/html
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        resp = Response(mimetype=mimetype, headers={'X-Accel-Redirect': internal_path})
+    else:
+        # serve uploaded files (ETag/Last-Modified, answers 304 on revalidation)
+        resp = send_from_directory(app.config['UPLOAD_FOLDER'], filename,
+                                   conditional=True, max_age=max_age)
+    resp.headers['Cache-Control'] = f'public, max-age={max_age}, immutable'
+    return resp
 
 # ------------------ SOCKET.IO EVENTS ------------------
+@socketio.on('connect')
+def handle_connect(auth):
+    # verify the signed token once; later events read the user from the socket session
+    try:
+        token = auth.get('token', '') if isinstance(auth, dict) else ''
+        identity = socket_token_serializer.loads(token, max_age=app.config['SOCKET_TOKEN_MAX_AGE'])
+    except BadSignature:
+        return False
+    if not isinstance(identity, dict):
+        # token minted before it carried the username
+        return False
+    socketio.server.save_session(request.sid, identity)
+    # per-user room used for dashboard refreshes
+    join_room(f"user_{identity['uid']}")
+
+def socket_user():
+    # {'uid', 'username'} saved at connect (in memory, no DB / Flask-Login per event)
+    return socketio.server.get_session(request.sid)
+
 @socketio.on('join_board')
 def handle_join(data):
-    room = f"board_{data['board_id']}"
+    board_id = data.get('board_id')
+    if not isinstance(board_id, int):
+        return
+    uid = socket_user()['uid']
+    owner_id = db.session.query(Board.user_id).filter_by(id=board_id).scalar()
+    if owner_id is None or (owner_id != uid and not is_collaborator(board_id, uid)):
+        return
+    room = f"board_{board_id}"
     join_room(room)
     print(f"🟢 Joined {room}")
 
@@ -370,25 +689,26 @@ def handle_leave(data):
 def handle_join_collab(data):
     # clients on dashboard call this to join the global collab room
     room = 'collab_room'
-    username = data.get('username', 'Anonymous')
+    username = socket_user()['username']
     join_room(room)
     emit('message', {'username': 'System', 'message': f'{username} joined the collaboration chat.'}, room=room)
 
 @socketio.on('leave_collab')
 def handle_leave_collab(data):
     room = 'collab_room'
-    username = data.get('username', 'Anonymous')
+    username = socket_user()['username']
     leave_room(room)
     emit('message', {'username': 'System', 'message': f'{username} left the collaboration chat.'}, room=room)
 
 @socketio.on('send_collab_message')
 def handle_collab_message(data):
     """
-    Accepts { username, message? , file? , filename? }
-    Broadcasts to collab_room a payload containing the same keys that arrived
+    Accepts { message? , file? , filename? }
+    Broadcasts to collab_room the same keys plus the sender's username
+    (taken from the authenticated socket session, not from the client)
     """
     room = 'collab_room'
-    username = data.get('username', 'Anonymous')
+    username = socket_user()['username']
     message = data.get('message')
     file = data.get('file')
     filename = data.get('filename')
@@ -407,12 +727,15 @@ def handle_collab_message(data):
 # Per-board chat events (only members who joined the board room will receive)
 @socketio.on('send_board_message')
 def handle_board_message(data):
-    # data: board_id, username, message
+    # data: board_id, message
     board_id = data.get('board_id')
     if not board_id:
         return
     room = f'board_{board_id}'
-    username = data.get('username', 'Anonymous')
+    # only sockets that passed the join_board membership check may post
+    if room not in rooms():
+        return
+    username = socket_user()['username']
     message = data.get('message', '')
     emit('board_message', {'board_id': board_id, 'username': username, 'message': message}, room=room)
 
@@ -421,5 +744,13 @@ if __name__ == '__main__':
     with app.app_context():
         db.create_all()
         print("✅ Database ready with real-time collaboration and uploads.")
-    # Use eventlet or gevent in production. For local dev, this runs fine.
+    # flag N+1 lazy loads during local development (optional dependency)
+    try:
+        from nplusone.ext.flask_sqlalchemy import NPlusOne
+        NPlusOne(app)
+    except ImportError:
+        pass
+    app.config['TEMPLATES_AUTO_RELOAD'] = True
+    app.jinja_env.auto_reload = True
+    # Runs on the eventlet server; in production use gunicorn eventlet workers (see README).
     socketio.run(app, debug=True)
@@ -0,0 +1,6 @@
+-- Indexes declared in __table_args__ on Board, List and Card.
+-- db.create_all() only adds them to brand-new tables; run this once on an
+-- existing database:  psql -d postgres -f migrations/0001_add_lookup_indexes.sql
+CREATE INDEX IF NOT EXISTS ix_board_user_id ON board (user_id);
+CREATE INDEX IF NOT EXISTS ix_list_board_id ON list (board_id);
+CREATE INDEX IF NOT EXISTS ix_card_list_position ON card (list_id, position);
@@ -0,0 +1,4 @@
+-- Case-insensitive unique usernames (ix_users_username_lower on User).
+-- Fails if existing names collide ignoring case; find them first with:
+--   SELECT lower(username), count(*) FROM users GROUP BY 1 HAVING count(*) > 1;
+CREATE UNIQUE INDEX IF NOT EXISTS ix_users_username_lower ON users (lower(username));
@@ -0,0 +1,15 @@
+-- date_created is filled by the database (server_default on User, Board, Card).
+-- Existing tables have no DB default, so without this new rows get NULL and the
+-- board page fails on .strftime. Also backfills any such rows and applies the
+-- model's NOT NULL.
+ALTER TABLE users ALTER COLUMN date_created SET DEFAULT timezone('utc', now());
+ALTER TABLE board ALTER COLUMN date_created SET DEFAULT timezone('utc', now());
+ALTER TABLE card ALTER COLUMN date_created SET DEFAULT timezone('utc', now());
+
+UPDATE users SET date_created = timezone('utc', now()) WHERE date_created IS NULL;
+UPDATE board SET date_created = timezone('utc', now()) WHERE date_created IS NULL;
+UPDATE card SET date_created = timezone('utc', now()) WHERE date_created IS NULL;
+
+ALTER TABLE users ALTER COLUMN date_created SET NOT NULL;
+ALTER TABLE board ALTER COLUMN date_created SET NOT NULL;
+ALTER TABLE card ALTER COLUMN date_created SET NOT NULL;